@@ -1,7 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+import functools
 import math
+import re
+import sys
+
+import orjson
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # parser summaries are far smaller
 
 # ==============================
 # Small, clear helpers
@@ -13,9 +19,48 @@ def fmt_exp(x: float) -> str:
         return str(int(round(x)))
     return f"{x:.2f}"
 
+# Fixed f(n) spellings -> (kind, param, label). Keys are interned ("log n" and
+# "n log n" aren't automatically) so lookups with an interned f match by identity.
+_LITERALS = {sys.intern(k): v for k, v in {
+    "1": ("const", None, "Θ(1)"),
+    "constant": ("const", None, "Θ(1)"),
+    "log n": ("log", None, "Θ(log n)"),
+    "n": ("n", None, "Θ(n)"),
+    "n log n": ("nlogn", None, "Θ(n log n)"),
+}.items()}
+_NK_RE = re.compile(r"^n\^\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+))$")
+
+# Longest f(n) string kept as a cache key; the parser only emits short spellings
+# like "n^2", and bodies of up to MAX_CONTENT_LENGTH shouldn't be pinned in memory.
+_MAX_CACHED_EXPR = 64
+
+def _classify_f(expr: str):
+    raw = expr.strip()
+    f = sys.intern(raw.lower())
+
+    hit = _LITERALS.get(f)
+    if hit:
+        return hit
+    m = _NK_RE.match(f)
+    if m:
+        k = float(m.group(1))
+    elif f.startswith("n^"):
+        # Rarer spellings float() also accepts (n^2e0, n^1_0); inf/nan stay unsupported.
+        try:
+            k = float(f[2:])
+        except ValueError:
+            return "unsupported", None, raw
+        if not math.isfinite(k):
+            return "unsupported", None, raw
+    else:
+        return "unsupported", None, raw
+    return "nk", k, f"Θ(n^{fmt_exp(k)})"
+
+_classify_f_cached = functools.lru_cache(maxsize=512)(_classify_f)
+
 def classify_f(expr: str):
     """
-    Map f(n) string -> a simple class:
+    Map f(n) string -> a simple class (memoized for short strings; expr must be a str):
       Returns: (kind, param, label)
         - ("const", None, "Θ(1)")
         - ("log", None, "Θ(log n)")
@@ -24,24 +69,25 @@ def classify_f(expr: str):
         - ("nlogn", None, "Θ(n log n)")
         - ("unsupported", None, raw)
     """
-    raw = (expr or "").strip()
-    f = raw.lower().strip()
-
-    if f in ("1", "constant"):
-        return "const", None, "Θ(1)"
-    if f == "log n":
-        return "log", None, "Θ(log n)"
-    if f == "n":
-        return "n", None, "Θ(n)"
-    if f.startswith("n^"):
-        try:
-            k = float(f[2:])
-            return "nk", k, f"Θ(n^{fmt_exp(k)})"
-        except ValueError:
-            return "unsupported", None, raw
-    if f == "n log n":
-        return "nlogn", None, "Θ(n log n)"
-    return "unsupported", None, raw
+    if len(expr) > _MAX_CACHED_EXPR:
+        return _classify_f(expr)
+    return _classify_f_cached(expr)
+
+# kind -> (poly_degree, has_log); "nk" takes its degree from k, unsupported => weakest
+_BASE_RANK = {
+    "const": (0.0, False),
+    "log": (0.0, True),   # log n < n^ε but mark as log
+    "n": (1.0, False),
+    "nk": (0.0, False),
+    "nlogn": (1.0, True),
+}
+_WEAKEST_RANK = (0.0, False)
+_EPS = 1e-9
+
+def _rank(kind, k):
+    if kind == "nk":
+        return float(k), False
+    return _BASE_RANK.get(kind, _WEAKEST_RANK)
 
 def compare_growth(current_kind, current_k, inferred_kind, inferred_k) -> bool:
     """
@@ -49,137 +95,181 @@ def compare_growth(current_kind, current_k, inferred_kind, inferred_k) -> bool:
     Very small comparator to keep it simple:
       Order by polynomial degree first, then log factor presence.
     """
-    def to_rank(kind, k):
-        # (poly_degree, has_log)
-        if kind == "const":
-            return (0.0, False)
-        if kind == "log":
-            return (0.0, True)   # log n < n^ε but mark as log
-        if kind == "n":
-            return (1.0, False)
-        if kind == "nk":
-            return (float(k), False)
-        if kind == "nlogn":
-            return (1.0, True)
-        # unsupported => weakest
-        return (0.0, False)
-
-    p1, lg1 = to_rank(current_kind, current_k)
-    p2, lg2 = to_rank(inferred_kind, inferred_k)
+    p1, lg1 = _rank(current_kind, current_k)
+    p2, lg2 = _rank(inferred_kind, inferred_k)
 
     if p2 > p1:
         return True
-    if abs(p2 - p1) < 1e-9 and lg2 and not lg1:
-        return True
-    return False
+    return abs(p2 - p1) < _EPS and lg2 and not lg1
+
+# f(n) kind -> integer id understood by _mt_kernel
+_KIND_IDS = {"const": 0, "n": 1, "nk": 2, "log": 3, "nlogn": 4}
+_KIND_LOG = _KIND_IDS["log"]
+_KIND_NLOGN = _KIND_IDS["nlogn"]
+
+_CASE_NOTES = {
+    1: "Case 1: f(n) = o(n^{log_b(a)}).",
+    2: "Case 2: f(n) = Θ(n^{log_b(a)}).",
+    3: "Case 3: f(n) = Ω(n^{log_b(a)}), regularity assumed.",
+}
+_NLOGN_CASE_NOTES = {
+    1: "Case 1: n^{log_b(a)} dominates.",
+    2: "Case 2: f(n) = Θ(n^{log_b(a)} · log n).",
+    3: _CASE_NOTES[3],
+}
+
+@functools.lru_cache(maxsize=64)
+def _logba(a: float, b: float) -> float:
+    """log_b(a) via log2, cached for the handful of (a, b) pairs seen in practice."""
+    return math.log2(a) / math.log2(b)
+
+def _mt_kernel(log_ab, kind_id, f_pow):
+    """
+    Numeric core of the Master Theorem (no strings).
+    f_pow is the polynomial degree of f(n) for kinds const/n/nk.
+    Returns (case_id, sol_pow, has_log) meaning O(n^sol_pow [log n]).
+    """
+    if kind_id == _KIND_LOG:
+        return 1, log_ab, False
+    if kind_id == _KIND_NLOGN:
+        if abs(log_ab - 1.0) < _EPS:
+            return 2, 1.0, True
+        if log_ab < 1.0:
+            return 3, 1.0, True
+        return 1, log_ab, False
+
+    # const / n / n^k: compare f(n) to n^{log_b a}
+    if f_pow < log_ab - _EPS:
+        return 1, log_ab, False
+    if abs(f_pow - log_ab) <= _EPS:
+        return 2, f_pow, True
+    return 3, f_pow, False
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _solve_master_cached(a: float, b: float, f_expr: str, verbose: bool) -> tuple:
+    """
+    Memoized body of solve_master_theorem.
+    typed=True keeps 2 and 2.0 apart since both are echoed in the recurrence text.
+    Returns (error, recurrence, solution, case_reasoning); error is None on success.
+    case_reasoning is only formatted when verbose, otherwise it is ().
+    """
+    if a <= 0:
+        return "Master Theorem requires a > 0.", None, None, ()
+    if b <= 1:
+        return "Master Theorem requires b > 1.", None, None, ()
 
-def solve_master_theorem(a: float, b: float, f_expr: str):
+    kind, k, f_label = classify_f(f_expr)
+    if kind == "unsupported":
+        return f"Unsupported f(n): {f_expr}", None, None, ()
+
+    kind_id = _KIND_IDS[kind]
+    f_pow = 1.0 if kind == "n" else (float(k) if kind == "nk" else 0.0)
+    log_ab = _logba(float(a), float(b))
+    case_id, sol_pow, has_log = _mt_kernel(log_ab, kind_id, f_pow)
+
+    # Strings stay in Python; the kernel only decides the case.
+    if kind_id == _KIND_NLOGN and has_log:
+        sol = "O(n log n)"
+    elif has_log:
+        sol = f"O(n^{fmt_exp(sol_pow)} log n)"
+    else:
+        sol = f"O(n^{fmt_exp(sol_pow)})"
+
+    recurrence = f"T(n) = {a}T(n/{b}) + {f_expr}"
+    if not verbose:
+        return None, recurrence, sol, ()
+
+    notes = _NLOGN_CASE_NOTES if kind_id == _KIND_NLOGN else _CASE_NOTES
+    lines = (
+        recurrence,
+        f"log_b(a) = log_{b}({a}) = {log_ab:.2f}",
+        notes[case_id],
+    )
+    return None, recurrence, sol, lines
+
+def solve_master_theorem(a: float, b: float, f_expr: str, verbose: bool = True):
     """
     Solve T(n) = a T(n/b) + f(n) for the standard Master Theorem cases.
     Supports: 1, constant, log n, n, n^k, n log n
     Returns dict with {recurrence, solution, case_reasoning} or {error: ...}
+    (case_reasoning only when verbose).
     """
     if not (isinstance(a, (int, float)) and isinstance(b, (int, float))):
         return {"error": "Invalid a or b."}
-    if b <= 1:
-        return {"error": "Master Theorem requires b > 1."}
-
-    kind, k, f_label = classify_f(f_expr)
-    if kind == "unsupported":
+    if not isinstance(f_expr, str):
         return {"error": f"Unsupported f(n): {f_expr}"}
 
-    log_ab = math.log(a, b)
-    lines = [
-        f"T(n) = {a}T(n/{b}) + {f_expr}",
-        f"log_b(a) = log_{b}({a}) = {log_ab:.2f}"
-    ]
-
-    # Handle cases by comparing f(n) to n^{log_b a}
-    if kind == "log":
-        sol = f"O(n^{fmt_exp(log_ab)})"
-        lines.append("Case 1: f(n) = o(n^{log_b(a)}).")
-    elif kind == "nlogn":
-        if abs(log_ab - 1.0) < 1e-9:
-            sol = "O(n log n)"
-            lines.append("Case 2: f(n) = Θ(n^{log_b(a)} · log n).")
-        elif log_ab < 1.0:
-            sol = "O(n log n)"
-            lines.append("Case 3: f(n) = Ω(n^{log_b(a)}), regularity assumed.")
-        else:
-            sol = f"O(n^{fmt_exp(log_ab)})"
-            lines.append("Case 1: n^{log_b(a)} dominates.")
-    elif kind in ("const", "n", "nk"):
-        f_pow = 0.0 if kind == "const" else (1.0 if kind == "n" else float(k))
-        if f_pow < log_ab - 1e-9:
-            sol = f"O(n^{fmt_exp(log_ab)})"
-            lines.append("Case 1: f(n) = o(n^{log_b(a)}).")
-        elif abs(f_pow - log_ab) <= 1e-9:
-            sol = f"O(n^{fmt_exp(f_pow)} log n)"
-            lines.append("Case 2: f(n) = Θ(n^{log_b(a)}).")
-        else:
-            sol = f"O(n^{fmt_exp(f_pow)})"
-            lines.append("Case 3: f(n) = Ω(n^{log_b(a)}), regularity assumed.")
-    else:
-        return {"error": f"Unsupported f(n): {f_expr}"}
-
-    return {
-        "recurrence": f"T(n) = {a}T(n/{b}) + {f_expr}",
-        "solution": sol,
-        "case_reasoning": lines
-    }
+    # Oversized f(n) strings skip the cache (see _MAX_CACHED_EXPR).
+    solve = _solve_master_cached if len(f_expr) <= _MAX_CACHED_EXPR else _solve_master_cached.__wrapped__
+    error, recurrence, sol, lines = solve(a, b, f_expr, bool(verbose))
+    if error:
+        return {"error": error}
+    result = {"recurrence": recurrence, "solution": sol}
+    if verbose:
+        result["case_reasoning"] = list(lines)
+    return result
 
 # ==============================
 # Recurrence extraction & f(n) upgrade from callees
 # ==============================
 
-def extract_recurrence(doc: dict):
-    """
-    Look for a recurrence dict with keys a, b, f in a few obvious spots.
-    Return (a, b, f, src_label, func_name) or None.
-    """
-    # top-level
-    if isinstance(doc.get("recurrence"), dict):
-        r = doc["recurrence"]
-        if {"a", "b", "f"} <= r.keys():
-            return r["a"], r["b"], r["f"], "recurrence", r.get("function")
+_REC_KEYS = frozenset(("a", "b", "f"))
 
-    summary = doc.get("summary", {})
-    # summary.recurrence
-    if isinstance(summary.get("recurrence"), dict):
-        r = summary["recurrence"]
-        if {"a", "b", "f"} <= r.keys():
-            return r["a"], r["b"], r["f"], "summary.recurrence", r.get("function")
+def _summary_recurrence(doc, summary):
+    r = summary.get("recurrence")
+    return (r, r.get("function")) if isinstance(r, dict) else None
 
-    # summary.recurrences (exactly one)
+def _summary_recurrences(doc, summary):
+    # exactly one
     recs = [r for r in summary.get("recurrences", []) if isinstance(r, dict)]
-    if len(recs) == 1 and {"a", "b", "f"} <= recs[0].keys():
-        r = recs[0]
-        func = r.get("function")
-        return r["a"], r["b"], r["f"], "summary.recurrences[0]", func
+    return (recs[0], recs[0].get("function")) if len(recs) == 1 else None
 
-    # functions[*].recurrence (exactly one)
-    fns = summary.get("functions", [])
+def _function_recurrence(doc, summary):
+    # exactly one function carrying a complete recurrence
     fn_matches = []
-    for f in fns:
-        if isinstance(f, dict) and isinstance(f.get("recurrence"), dict):
-            r = f["recurrence"]
-            if {"a", "b", "f"} <= r.keys():
-                fn_matches.append((f.get("name"), r))
-    if len(fn_matches) == 1:
-        name, r = fn_matches[0]
-        return r["a"], r["b"], r["f"], "summary.functions[*].recurrence", name
+    for f in summary.get("functions", []):
+        if isinstance(f, dict):
+            r = f.get("recurrence")
+            if isinstance(r, dict) and _REC_KEYS <= r.keys():
+                fn_matches.append((r, f.get("name")))
+    return fn_matches[0] if len(fn_matches) == 1 else None
+
+def _top_level_recurrence(doc, summary):
+    r = doc.get("recurrence")
+    return (r, r.get("function")) if isinstance(r, dict) else None
+
+# Precedence order, not likelihood: a caller-supplied top-level recurrence
+# overrides the parser's, and the parser fills all three summary spots for a
+# single recurrence, so these sources are not interchangeable.
+_RECURRENCE_SOURCES = (
+    (_top_level_recurrence, "recurrence"),
+    (_summary_recurrence, "summary.recurrence"),
+    (_summary_recurrences, "summary.recurrences[0]"),
+    (_function_recurrence, "summary.functions[*].recurrence"),
+)
 
+def extract_recurrence(doc: dict):
+    """
+    Look for a recurrence dict with keys a, b, f in a few obvious spots.
+    Return (a, b, f, src_label, func_name) or None.
+    """
+    summary = doc.get("summary", {})
+    for getter, src in _RECURRENCE_SOURCES:
+        hit = getter(doc, summary)
+        if hit:
+            r, func = hit
+            if _REC_KEYS <= r.keys():
+                return r["a"], r["b"], r["f"], src, func
     return None
 
-def pick_recursive_function_name(summary: dict) -> str | None:
+def pick_recursive_function_name(funcs_by_name: dict) -> str | None:
     """Choose a recursive function if there is exactly one."""
-    funcs = [f for f in summary.get("functions", []) if isinstance(f, dict)]
-    rec = [f.get("name") for f in funcs if f.get("is_recursive")]
+    rec = [name for name, f in funcs_by_name.items() if f.get("is_recursive")]
     if len(rec) == 1:
         return rec[0]
     return None
 
-def infer_per_level_work(summary: dict, func_name: str) -> str | None:
+def infer_per_level_work(funcs_by_name: dict, func_name: str) -> str | None:
     """
     Infer per-level non-recursive work for a recursive function from its non-recursive callees.
     Returns an f(n) expression string: "1", "n", or "n^k".
@@ -187,30 +277,33 @@ def infer_per_level_work(summary: dict, func_name: str) -> str | None:
     if not func_name:
         return None
 
-    funcs = {f.get("name"): f for f in summary.get("functions", []) if isinstance(f, dict)}
-    F = funcs.get(func_name)
+    F = funcs_by_name.get(func_name)
     if not F:
         return None
 
     callees = F.get("calls", []) or []
     inferred_degree = 0  # 0 => constant by default
 
+    # Local binds: the loop below runs once per callee.
+    get = dict.get
+    lookup = funcs_by_name.get
+
     for callee_name in callees:
-        G = funcs.get(callee_name)
-        if not G or G.get("is_recursive"):
+        G = lookup(callee_name)
+        if not G or get(G, "is_recursive"):
             continue  # only consider non-recursive helpers
 
-        depth = G.get("maxLoopDepth", 0) or 0
-        loop_count = G.get("loopCount", 0) or 0
+        depth = get(G, "maxLoopDepth", 0) or 0
 
         # If a helper has any loop nesting, model as n^depth (depth>=1 -> at least linear).
         if depth >= 1:
-            inferred_degree = max(inferred_degree, int(depth))
+            if depth > inferred_degree:
+                inferred_degree = int(depth)
             continue
 
         # If no depth reported but loops exist, conservatively treat as linear
-        if depth == 0 and loop_count > 0:
-            inferred_degree = max(inferred_degree, 1)
+        if depth == 0 and (get(G, "loopCount", 0) or 0) > 0 and inferred_degree < 1:
+            inferred_degree = 1
 
     if inferred_degree <= 0:
         return "1"
@@ -223,8 +316,8 @@ def upgrade_f_if_weaker(provided_f: str, inferred_f: str) -> tuple[str, bool]:
     If inferred_f is asymptotically stronger than provided_f, return inferred_f and True.
     Otherwise return provided_f and False.
     """
-    pk, pkval, _ = classify_f(provided_f)
-    ik, ikval, _ = classify_f(inferred_f)
+    pk, pkval, _ = classify_f(provided_f or "")
+    ik, ikval, _ = classify_f(inferred_f or "")
 
     if pk == "unsupported":
         return inferred_f, True
@@ -244,7 +337,13 @@ def loop_baseline(summary: dict) -> tuple[str, list[str]]:
     Derive an O(n^d) headline from loop nesting depth as a baseline.
     """
     loops = summary.get("loops", [])
-    depth = max((int(l.get("depth", 1) or 1) for l in loops), default=0)
+    depth = 0
+    for l in loops:
+        d = l.get("depth", 1) or 1
+        if type(d) is not int:  # parser already emits ints; only coerce strays (incl. bools)
+            d = int(d)
+        if d > depth:
+            depth = d
     headline = f"O(n^{depth})" if depth > 0 else "O(1)"
     expl = [f"Detected {len(loops)} loops; max depth = {depth}"]
     return headline, expl
@@ -253,15 +352,45 @@ def loop_baseline(summary: dict) -> tuple[str, list[str]]:
 # HTTP API
 # ==============================
 
+def _json(obj, status: int = 200) -> Response:
+    """JSON response encoded with orjson (much faster than jsonify's stdlib json)."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+def _load_json(req):
+    """Decode the request body with orjson (body is not kept around); None if not JSON."""
+    try:
+        return orjson.loads(req.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    doc = request.get_json(silent=True)
+    doc = _load_json(request)
     if not isinstance(doc, dict) or "summary" not in doc:
-        return jsonify({"error": "invalid input"}), 400
+        return _json({"error": "invalid input"}, 400)
 
     summary = doc["summary"]
+    # Nothing to analyze (empty code, health-check pings): skip the pipeline.
+    if not (summary.get("functions") or summary.get("loops") or summary.get("recurrence")
+            or summary.get("recurrences") or doc.get("recurrence")):
+        return _json({"complexity": "O(1)", "explanation": ["empty summary"]})
+
+    verbose = request.args.get("verbose") == "1"
     functions = summary.get("functions", [])
-    recursive_names = [f["name"] for f in functions if isinstance(f, dict) and f.get("is_recursive")]
+    # Index functions in a single pass; every helper below works off this dict.
+    funcs_by_name = {}
+    recursive_names = []
+    total_loops = 0
+    for f in functions:
+        if not isinstance(f, dict):
+            continue
+        total_loops += int(f.get("loopCount", 0) or 0)  # unnamed entries' loops count too
+        name = f.get("name")
+        if not name:
+            continue
+        funcs_by_name[name] = f
+        if f.get("is_recursive"):
+            recursive_names.append(name)
     headline, expl = loop_baseline(summary)
     expl.append(("recursive functions present: " + ", ".join(recursive_names)) if recursive_names
                 else "no recursive functions detected")
@@ -278,9 +407,9 @@ def analyze():
         # 1a) Try to upgrade f(n) using non-recursive callees of the recursive function (if we know it).
         # If we don't know which function, but there is exactly one recursive function, use that.
         if not rec_func_name:
-            rec_func_name = pick_recursive_function_name(summary)
+            rec_func_name = pick_recursive_function_name(funcs_by_name)
 
-        inferred_f = infer_per_level_work(summary, rec_func_name) if rec_func_name else None
+        inferred_f = infer_per_level_work(funcs_by_name, rec_func_name) if rec_func_name else None
         if inferred_f:
             new_f, upgraded = upgrade_f_if_weaker(f_expr, inferred_f)
             if upgraded:
@@ -289,7 +418,7 @@ def analyze():
                 f_expr = new_f
 
         # 1b) Solve via Master Theorem.
-        recurrence_output = solve_master_theorem(a, b, f_expr)
+        recurrence_output = solve_master_theorem(a, b, f_expr, verbose)
         if "solution" in recurrence_output:
             headline = recurrence_output["solution"]
             lead = f"Solved via Master Theorem (from {src}) a={a}, b={b}, f(n)={f_expr}"
@@ -299,18 +428,17 @@ def analyze():
 
     # 2) If no solvable recurrence, tiny heuristic: recursion + no loops => linear.
     if not recurrence_output:
-        has_recursive = bool(recursive_names)
-        total_loops = sum(int(f.get("loopCount", 0) or 0) for f in functions)
-        if has_recursive and total_loops == 0:
+        if recursive_names and total_loops == 0:
             headline = "O(n)"
             expl.insert(0, "Inferred recurrence: T(n)=T(n-1)+Θ(1) — no loops + recursion (linear fallback).")
             recurrence_output = {
                 "recurrence": "T(n)=T(n-1)+Θ(1)",
                 "solution": "O(n)",
-                "case_reasoning": ["Linear recursion with constant work per step."]
             }
+            if verbose:
+                recurrence_output["case_reasoning"] = ["Linear recursion with constant work per step."]
 
     result = {"complexity": headline, "explanation": expl}
     if recurrence_output:
         result["recurrence_solution"] = recurrence_output
-    return jsonify(result)
+    return _json(result)
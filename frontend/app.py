@@ -1,10 +1,19 @@
 from flask import Flask, request, render_template
-import requests, json
+import urllib3, json
 
 app = Flask(__name__)
 
 PARSER_URL = "http://parser-c:7001/parse"
-ANALYZER_URL = "http://analyzer:7100/analyze"
+ANALYZER_URL = "http://analyzer:7100/analyze?verbose=1"
+
+# One connection pool per backend, shared by gunicorn's worker threads. The
+# analyzer keeps connections alive (gthread workers); the C parser answers with
+# "Connection: close", so its calls still open a socket each time. Unlike
+# requests.Session, PoolManager is thread-safe and has no cookie jar shared
+# between users. Timeouts are (connect, read) seconds so a stuck backend can't
+# wedge the pool; no retries, matching requests' default.
+HTTP = urllib3.PoolManager(num_pools=2, maxsize=8, retries=False,
+                           timeout=urllib3.Timeout(connect=1, read=10))
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -16,13 +25,13 @@ def index():
         code = request.form["code"]
         try:
             # 1) Parser: get AST + summary (JSON)
-            parser_resp = requests.post(PARSER_URL, json={"language":"c","code":code})
+            parser_resp = HTTP.request("POST", PARSER_URL, json={"language":"c","code":code})
             parser_json = parser_resp.json()  # <- dict
             ast_output = parser_json.get("ast", {})
             summary = parser_json.get("summary", {})
 
             # 2) Analyzer: send summary (JSON) and get result
-            analyzer_resp = requests.post(ANALYZER_URL, json={"summary": summary})
+            analyzer_resp = HTTP.request("POST", ANALYZER_URL, json={"summary": summary})
             analysis_output = analyzer_resp.json()  # <- dict
 
         except Exception as e: